@@ -4,6 +4,13 @@ import requests
 from urllib.parse import urlencode
 from dotenv import load_dotenv
 import pandas as pd
+from artist_songs import ArtistSongs, get_songs_by_artists
+from export import export_dataframe
+from recency import (
+    get_top_decayed_tracks,
+    get_rolling_window_scores,
+    get_top_tracks_by_reference_date,
+)
 
 load_dotenv()
 
@@ -167,7 +174,10 @@ def create_playlists() -> dict | None:
     # create_top_songs_by_year_playlists(token, user_id, listening_data)
     # create_top_songs_by_top_artists_playlists(token, user_id, listening_data)
     # create_seasonal_playlists(token, user_id, listening_data)
+    # create_recently_obsessed_playlist(token, user_id, listening_data)
+    # create_rising_songs_playlist(token, user_id, listening_data)
     # create_top_songs_by_artist_playlists(token, user_id, listening_data, "Passenger")
+    # create_top_songs_by_artists_playlists(token, user_id, listening_data, 200)
     create_all_songs_by_artist_playlists(token, user_id, listening_data, "Passenger")
     # export_sorted_artists_songs_to_csv(listening_data, "Passenger")
 
@@ -181,31 +191,18 @@ def get_top_songs_by_top_artists(df: pd.DataFrame) -> pd.DataFrame:
     # Step 2: Identify the top 10 artists by listening time
     top_10_artists = artist_listening_time.nlargest(10, "ms_played")
 
-    # Initialize an empty DataFrame to hold the top 5 songs for each of the top 10 artists
-    top_songs_by_top_artists = pd.DataFrame()
+    # Step 3: Find the top 5 most played songs of all 10 artists in one pass
+    top_artists = top_10_artists["master_metadata_album_artist_name"].tolist()
+    if not top_artists:
+        return pd.DataFrame()
 
-    # Step 3: For each of the top 10 artists, find their top 5 most played songs
-    for artist in top_10_artists["master_metadata_album_artist_name"]:
-        # Filter the original DataFrame for the current artist
-        artist_songs = df[df["master_metadata_album_artist_name"] == artist]
+    artist_songs = get_songs_by_artists(df, top_artists, 5)
 
-        # Group by song (track URI) and sum the ms_played, then get the top 5 songs
-        top_songs = (
-            artist_songs.groupby(["spotify_track_uri", "master_metadata_track_name"])[
-                "ms_played"
-            ]
-            .sum()
-            .nlargest(5)
-            .reset_index()
-        )
-
-        # Add an artist name column to the top_songs DataFrame for clarity
-        top_songs["artist_name"] = artist
-
-        # Append the results to the top_songs_by_top_artists DataFrame
-        top_songs_by_top_artists = pd.concat(
-            [top_songs_by_top_artists, top_songs], ignore_index=True
-        )
+    # Stack them in top artist order, with an artist name column for clarity
+    top_songs_by_top_artists = pd.concat(
+        [artist_songs[artist].assign(artist_name=artist) for artist in top_artists],
+        ignore_index=True,
+    )
 
     return top_songs_by_top_artists
 
@@ -477,29 +474,96 @@ def create_top_monthly_songs_playlist(token: str, user_id: str, df: pd.DataFrame
     )
 
 
-def get_top_songs_by_artist(
-    df: pd.DataFrame, artist: str, size: int = 20
+def get_recently_obsessed_songs(
+    df: pd.DataFrame, half_life: str = "30D", size: int = 50
 ) -> pd.DataFrame:
-    """A playlist of top songs listened to for a specific artist."""
-    artist_songs = df[df["master_metadata_album_artist_name"] == artist]
+    """Top songs as of the last play, ranked by play time that halves in weight every half_life."""
+    return get_top_decayed_tracks(df, [df["ts"].max()], half_life, size)
 
-    # Group by song (track URI) and sum the ms_played, then get the top 5 songs
-    top_songs = (
-        artist_songs.groupby(["spotify_track_uri", "master_metadata_track_name"])[
-            "ms_played"
-        ]
-        .sum()
-        .nlargest(size)
-        .reset_index()
+
+def create_recently_obsessed_playlist(token: str, user_id: str, df: pd.DataFrame):
+    recently_obsessed_songs = get_recently_obsessed_songs(df)
+
+    playlist_id = create_playlist(
+        token,
+        user_id,
+        "Recently Obsessed",
+        "The 50 songs I've been playing the most lately on Spotify, recent plays count more.",
+    )
+
+    add_tracks_to_playlist(
+        recently_obsessed_songs["spotify_track_uri"].tolist(),
+        token,
+        user_id,
+        playlist_id,
     )
 
-    return top_songs
+
+def get_rising_songs(df: pd.DataFrame, size: int = 50) -> pd.DataFrame:
+    """Songs played more in the last 30 days than their average 30 days over the last 90, by how much more."""
+    last_play = df["ts"].max()
+    last_30_days = get_rolling_window_scores(df, [last_play], "30D")
+    last_90_days = get_rolling_window_scores(df, [last_play], "90D")
+
+    return get_top_tracks_by_reference_date(last_30_days - last_90_days / 3, size)
+
+
+def create_rising_songs_playlist(token: str, user_id: str, df: pd.DataFrame):
+    rising_songs = get_rising_songs(df)
+
+    playlist_id = create_playlist(
+        token,
+        user_id,
+        "Rising",
+        "The 50 songs I've been playing more and more in the last month on Spotify.",
+    )
+
+    add_tracks_to_playlist(
+        rising_songs["spotify_track_uri"].tolist(), token, user_id, playlist_id
+    )
+
+
+def get_weekly_favorites_timeline(
+    df: pd.DataFrame, half_life: str = "14D", size: int = 10
+) -> pd.DataFrame:
+    """What I was into each week: the top songs by decayed play time at the end of every week (Monday 00:00), the last entry being the final partial week as of the last play."""
+    last_play = df["ts"].max()
+    weeks = pd.DatetimeIndex([])
+    if pd.notna(last_play):
+        weeks = pd.date_range(
+            df["ts"].min(), last_play, freq="W", normalize=True
+        ) + pd.Timedelta("1D")
+        if len(weeks) == 0 or weeks[-1] < last_play:
+            weeks = weeks.append(pd.DatetimeIndex([last_play]))
+
+    return get_top_decayed_tracks(df, weeks, half_life, size)
+
+
+def get_top_songs_by_artist(
+    df: pd.DataFrame,
+    artist: str,
+    size: int = 20,
+    artist_songs: ArtistSongs | None = None,
+) -> pd.DataFrame:
+    """A playlist of top songs listened to for a specific artist. Pass artist_songs from get_songs_by_artists to skip recomputing when doing many artists, it is recomputed anyway if it doesn't cover the artist or was ranked with fewer than size songs per artist."""
+    if (
+        artist_songs is None
+        or artist not in artist_songs
+        or (artist_songs.size is not None and artist_songs.size < size)
+    ):
+        artist_songs = get_songs_by_artists(df, [artist], size)
+
+    return artist_songs[artist].head(size)
 
 
 def create_top_songs_by_artist_playlists(
-    token: str, user_id: str, df: pd.DataFrame, artist: str
+    token: str,
+    user_id: str,
+    df: pd.DataFrame,
+    artist: str,
+    artist_songs: ArtistSongs | None = None,
 ):
-    top_songs_by_artist = get_top_songs_by_artist(df, artist)
+    top_songs_by_artist = get_top_songs_by_artist(df, artist, artist_songs=artist_songs)
 
     playlist_id = create_playlist(
         token,
@@ -516,20 +580,36 @@ def create_top_songs_by_artist_playlists(
     )
 
 
-def get_all_songs_by_artist(df: pd.DataFrame, artist: str) -> pd.DataFrame:
-    artist_songs = df[df["master_metadata_album_artist_name"] == artist]
-
-    # Group by song (track URI) and sum the ms_played, and sort by ms_played descending
-    all_songs = (
-        artist_songs.groupby(["spotify_track_uri", "master_metadata_track_name"])[
-            "ms_played"
-        ]
+def create_top_songs_by_artists_playlists(
+    token: str, user_id: str, df: pd.DataFrame, count: int = 200
+):
+    """Create a top songs playlist for each of the top count artists by listening time, ranking all of them in a single pass."""
+    top_artists = (
+        df.groupby("master_metadata_album_artist_name")["ms_played"]
         .sum()
-        .sort_values(ascending=False)
-        .reset_index()
+        .nlargest(count)
+        .index.tolist()
     )
+    artist_songs = get_songs_by_artists(df, top_artists, 20)
+
+    for artist in top_artists:
+        create_top_songs_by_artist_playlists(
+            token, user_id, df, artist, artist_songs=artist_songs
+        )
+
+
+def get_all_songs_by_artist(
+    df: pd.DataFrame, artist: str, artist_songs: ArtistSongs | None = None
+) -> pd.DataFrame:
+    # All songs by the artist, sorted by ms_played descending. Recompute if the ranking doesn't cover the artist or was capped
+    if (
+        artist_songs is None
+        or artist not in artist_songs
+        or artist_songs.size is not None
+    ):
+        artist_songs = get_songs_by_artists(df, [artist])
 
-    return all_songs
+    return artist_songs[artist]
 
 
 def create_all_songs_by_artist_playlists(
@@ -555,9 +635,8 @@ def create_all_songs_by_artist_playlists(
 def export_sorted_artists_songs_to_csv(df: pd.DataFrame, artist: str):
     top_songs_by_artist = get_top_songs_by_artist(df, artist, 300)
 
-    # save to file
-    with open(f"{artist}_top_songs.csv", "w") as f:
-        f.write(top_songs_by_artist.to_csv())
+    # stream to file in chunks rather than building the whole csv string first
+    export_dataframe(top_songs_by_artist, f"{artist}_top_songs.csv", index=True)
 
 
 create_playlists()
@@ -0,0 +1,80 @@
+import pandas as pd
+
+ARTIST_COLUMN = "master_metadata_album_artist_name"
+
+
+class ArtistSongs:
+    """
+    Ranked songs for many artists, computed once and sliced per artist.
+
+    The underlying frame is sorted by artist and then by ms_played descending, so each
+    artist's songs are one contiguous block. Looking up an artist is a dict lookup plus a
+    positional slice, no scan over the other artists' rows. size is the per-artist cap the
+    songs were ranked with, None if every song was kept.
+    """
+
+    def __init__(self, songs: pd.DataFrame, size: int | None = None):
+        self.songs = songs.reset_index(drop=True)
+        self.size = size
+
+        # rows are grouped by artist, so each block ends at the running total of block sizes
+        sizes = self.songs.groupby(ARTIST_COLUMN, sort=False).size()
+        stops = sizes.cumsum()
+        self._bounds = dict(zip(sizes.index, zip(stops - sizes, stops)))
+        self._columns = [
+            i for i, c in enumerate(self.songs.columns) if c != ARTIST_COLUMN
+        ]
+
+    def __getitem__(self, artist: str) -> pd.DataFrame:
+        # unknown artists get an empty frame, same as filtering the full history would
+        start, stop = self._bounds.get(artist, (0, 0))
+        return self.songs.iloc[start:stop, self._columns].reset_index(drop=True)
+
+    def __contains__(self, artist: str) -> bool:
+        return artist in self._bounds
+
+    def __iter__(self):
+        return iter(self._bounds)
+
+    def __len__(self) -> int:
+        return len(self._bounds)
+
+    @property
+    def artists(self) -> list[str]:
+        return list(self._bounds)
+
+
+def get_songs_by_artists(
+    df: pd.DataFrame, artists: list[str] | None = None, size: int | None = None
+) -> ArtistSongs:
+    """
+    Rank the songs of every artist, or of a chosen set of artists, by ms_played in one groupby pass.
+
+    Parameters:
+    - df (pd.DataFrame): The streaming history
+    - artists (list[str]): Only rank songs by these artists. Defaults to every artist in df
+    - size (int): Keep at most this many songs per artist. Defaults to all of them
+
+    Returns:
+    - ArtistSongs: The ranked songs, indexable by artist name
+    """
+    if artists is not None:
+        df = df[df[ARTIST_COLUMN].isin(artists)]
+
+    artist_songs = (
+        df.groupby([ARTIST_COLUMN, "spotify_track_uri", "master_metadata_track_name"])[
+            "ms_played"
+        ]
+        .sum()
+        .reset_index()
+    )
+
+    # sorting on several keys is always stable, so songs tied on ms_played stay in track uri order
+    artist_songs = artist_songs.sort_values(
+        [ARTIST_COLUMN, "ms_played"], ascending=[True, False]
+    )
+
+    if size is not None:
+        artist_songs = artist_songs.groupby(ARTIST_COLUMN).head(size)
+
+    return ArtistSongs(artist_songs, size)
@@ -0,0 +1,107 @@
+import os
+import pandas as pd
+from artist_songs import get_songs_by_artists
+
+# number of rows written per chunk, keeps memory flat for large results
+CHUNK_SIZE = 10_000
+
+
+def iter_chunks(df: pd.DataFrame, chunk_size: int = CHUNK_SIZE):
+    """Yield consecutive row slices of df, each at most chunk_size rows long."""
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start : start + chunk_size]
+
+
+def write_csv(df: pd.DataFrame, f, chunk_size: int = CHUNK_SIZE, index: bool = False):
+    # only the first chunk carries the header
+    for i, chunk in enumerate(iter_chunks(df, chunk_size)):
+        chunk.to_csv(f, header=i == 0, index=index)
+
+    if df.empty:
+        df.to_csv(f, index=index)
+
+
+def write_jsonl(df: pd.DataFrame, f, chunk_size: int = CHUNK_SIZE, index: bool = False):
+    # one json object per line, index is folded into the records if requested
+    for chunk in iter_chunks(df, chunk_size):
+        if index:
+            chunk = chunk.reset_index()
+        f.write(chunk.to_json(orient="records", lines=True, date_format="iso"))
+
+
+def write_parquet(
+    df: pd.DataFrame, f, chunk_size: int = CHUNK_SIZE, index: bool = False
+):
+    # pyarrow is optional, it's only needed for parquet exports
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ModuleNotFoundError as e:
+        raise ImportError("Parquet export requires pyarrow: pip install pyarrow") from e
+
+    schema = pa.Schema.from_pandas(df, preserve_index=index)
+    with pq.ParquetWriter(f, schema) as writer:
+        for chunk in iter_chunks(df, chunk_size):
+            writer.write_table(
+                pa.Table.from_pandas(chunk, schema=schema, preserve_index=index)
+            )
+
+
+# format name -> (writer, file mode)
+EXPORTERS = {
+    "csv": (write_csv, "w"),
+    "jsonl": (write_jsonl, "w"),
+    "parquet": (write_parquet, "wb"),
+}
+
+
+def export_dataframe(
+    df: pd.DataFrame,
+    path_or_buf,
+    format: str | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    index: bool = False,
+):
+    """
+    Write any insight result to a file in chunks, without building the whole output in memory.
+
+    Parameters:
+    - df (pd.DataFrame): The result to export, e.g. the output of any of the get functions in app.py
+    - path_or_buf (str | os.PathLike | file handle): Where to write. Open handles must be text mode for csv/jsonl and binary mode for parquet
+    - format (str): One of "csv", "jsonl" or "parquet". Inferred from the file extension if not given
+    - chunk_size (int): Number of rows written at a time
+    - index (bool): Whether to include the DataFrame index in the output
+
+    Returns:
+    - None
+    """
+    if format is None:
+        if not isinstance(path_or_buf, (str, os.PathLike)):
+            raise ValueError("format must be given when exporting to a file handle")
+        format = os.path.splitext(path_or_buf)[1].lstrip(".").lower()
+
+    if format not in EXPORTERS:
+        raise ValueError(
+            f"Unsupported export format: {format!r}, expected one of {list(EXPORTERS)}"
+        )
+
+    writer, mode = EXPORTERS[format]
+
+    if isinstance(path_or_buf, (str, os.PathLike)):
+        with open(path_or_buf, mode, newline="" if mode == "w" else None) as f:
+            writer(df, f, chunk_size, index)
+    else:
+        writer(df, path_or_buf, chunk_size, index)
+
+
+def export_all_artists_songs(
+    df: pd.DataFrame,
+    path_or_buf,
+    format: str | None = None,
+    size: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+):
+    """Dump the ranked songs of every artist to a single file, see export_dataframe for the parameters."""
+    export_dataframe(
+        get_songs_by_artists(df, size=size).songs, path_or_buf, format, chunk_size
+    )
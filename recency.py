@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+
+
+def _reference_index(df: pd.DataFrame, reference_dates) -> pd.DatetimeIndex:
+    # sorted, unique, without NaT and in the same timezone as the ts column
+    references = pd.DatetimeIndex(reference_dates).dropna().unique().sort_values()
+    tz = df["ts"].dt.tz
+    if references.tz is None and tz is not None:
+        references = references.tz_localize(tz)
+    elif references.tz is not None and tz is None:
+        references = references.tz_convert(None)
+    return references
+
+
+def _bucket_plays(df: pd.DataFrame, points: pd.DatetimeIndex):
+    """
+    Assign every play to the bucket of the first point at or after it.
+
+    Returns the track uris, and for every play its track code, bucket, ms_played and age in ns relative
+    to its bucket's point. Plays after the last point, plays without a timestamp and plays without a
+    track uri (podcasts etc.) are dropped.
+    """
+    codes, tracks = pd.factorize(df["spotify_track_uri"])
+    ts = pd.DatetimeIndex(df["ts"]).as_unit("ns").asi8
+    point_ns = points.as_unit("ns").asi8
+    buckets = np.searchsorted(point_ns, ts, side="left")
+
+    keep = (codes >= 0) & (buckets < len(points)) & df["ts"].notna().to_numpy()
+    codes, buckets, ts = codes[keep], buckets[keep], ts[keep]
+
+    ms_played = df["ms_played"].to_numpy(dtype=float)[keep]
+    age = point_ns[buckets] - ts
+
+    return tracks, codes, buckets, ms_played, age
+
+
+def _iter_decayed_scores(df: pd.DataFrame, references: pd.DatetimeIndex, half_life):
+    """
+    Yield the decayed score of every track at each reference date in turn.
+
+    Only one vector of scores is kept: each step decays it across the gap from the previous date and
+    adds that bucket's plays. The yielded vector is updated in place on the next step, copy it to keep it.
+    """
+    rate = np.log(2) / pd.Timedelta(half_life).value
+    tracks, codes, buckets, ms_played, age = _bucket_plays(df, references)
+    weights = ms_played * np.exp(-rate * age)
+
+    # group the plays by bucket so each step only touches its own plays
+    order = np.argsort(buckets, kind="stable")
+    codes, weights = codes[order], weights[order]
+    bounds = np.searchsorted(buckets[order], np.arange(len(references) + 1))
+    reference_ns = references.as_unit("ns").asi8
+    gaps = np.exp(-rate * np.diff(reference_ns, prepend=reference_ns[:1]))
+
+    yield tracks
+    scores = np.zeros(len(tracks))
+    for j, gap in enumerate(gaps):
+        scores *= gap
+        scores += np.bincount(
+            codes[bounds[j] : bounds[j + 1]],
+            weights=weights[bounds[j] : bounds[j + 1]],
+            minlength=len(tracks),
+        )
+        yield scores
+
+
+def _top_rows(scores: np.ndarray, size: int) -> tuple[np.ndarray, np.ndarray]:
+    # positions and values of the top size positive scores, highest first
+    if size < len(scores):
+        top = np.argpartition(scores, len(scores) - size)[len(scores) - size :]
+    else:
+        top = np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind="stable")]
+    top = top[scores[top] > 0]
+    return top, scores[top]
+
+
+def _top_tracks_frame(references, tracks: pd.Index, picks: list) -> pd.DataFrame:
+    # picks holds one (positions, scores) pair from _top_rows per reference date
+    columns = ["reference_date", "rank", "spotify_track_uri", "score"]
+    if not picks:
+        return pd.DataFrame(columns=columns)
+
+    counts = [len(top) for top, _ in picks]
+    top_tracks = pd.DataFrame(
+        {
+            "reference_date": np.repeat(references, counts),
+            "rank": np.concatenate([np.arange(1, n + 1) for n in counts]),
+            "spotify_track_uri": tracks[np.concatenate([top for top, _ in picks])],
+            "score": np.concatenate([score for _, score in picks]),
+        }
+    )
+
+    return top_tracks[columns]
+
+
+def get_decayed_scores(
+    df: pd.DataFrame, reference_dates, half_life: str | pd.Timedelta = "30D"
+) -> pd.DataFrame:
+    """
+    Exponentially decayed play time of every track, evaluated at each reference date.
+
+    A play counts in full at the moment it happens and half as much every half_life after that, plays
+    after a reference date don't count towards it. Plays are bucketed between reference dates once, and
+    each score is the previous one decayed across the gap plus the new bucket, so adding reference dates
+    costs one vector update each instead of another pass over the history. The result is a dense
+    (track x date) matrix, use get_top_decayed_tracks when only the top tracks per date are needed.
+
+    Parameters:
+    - df (pd.DataFrame): The streaming history, with ts already parsed to datetimes
+    - reference_dates: Anything pd.DatetimeIndex accepts, e.g. a list of dates or pd.date_range(...)
+    - half_life (str | pd.Timedelta): How long it takes for a play to count half as much
+
+    Returns:
+    - pd.DataFrame: Scores indexed by spotify_track_uri, one column per reference date
+    """
+    references = _reference_index(df, reference_dates)
+    steps = _iter_decayed_scores(df, references, half_life)
+    tracks = next(steps)
+
+    # (date x track) so each step fills one contiguous row
+    decayed = np.empty((len(references), len(tracks)))
+    for j, scores in enumerate(steps):
+        decayed[j] = scores
+
+    return pd.DataFrame(
+        decayed.T,
+        index=pd.Index(tracks, name="spotify_track_uri"),
+        columns=references,
+    )
+
+
+def get_top_decayed_tracks(
+    df: pd.DataFrame,
+    reference_dates,
+    half_life: str | pd.Timedelta = "30D",
+    size: int = 20,
+) -> pd.DataFrame:
+    """
+    Top size tracks by decayed play time at each reference date, see get_decayed_scores.
+
+    The top tracks are picked as the scores are computed, so only one vector of scores is held at a time
+    rather than the full (track x date) matrix. Returns the same long form as get_top_tracks_by_reference_date.
+    """
+    references = _reference_index(df, reference_dates)
+    steps = _iter_decayed_scores(df, references, half_life)
+    tracks = next(steps)
+
+    picks = [_top_rows(scores, size) for scores in steps] if size > 0 else []
+
+    return _top_tracks_frame(references[: len(picks)], tracks, picks)
+
+
+def get_rolling_window_scores(
+    df: pd.DataFrame, reference_dates, window: str | pd.Timedelta = "30D"
+) -> pd.DataFrame:
+    """
+    Total play time of every track in the window ending at each reference date, i.e. (date - window, date].
+
+    Play time is bucketed at the reference dates and at the window starts, and cumulative sums over the
+    buckets give each window as the difference of two prefix sums.
+
+    Parameters:
+    - df (pd.DataFrame): The streaming history, with ts already parsed to datetimes
+    - reference_dates: Anything pd.DatetimeIndex accepts, e.g. a list of dates or pd.date_range(...)
+    - window (str | pd.Timedelta): Length of the window, e.g. "30D" or "90D"
+
+    Returns:
+    - pd.DataFrame: Play time in ms indexed by spotify_track_uri, one column per reference date
+    """
+    references = _reference_index(df, reference_dates)
+    starts = references - pd.Timedelta(window)
+    points = references.union(starts)
+
+    tracks, codes, buckets, ms_played, _ = _bucket_plays(df, points)
+    # (point x track) matrix, one row per point so the scans below touch contiguous rows
+    prefix = np.bincount(
+        buckets * len(tracks) + codes,
+        weights=ms_played,
+        minlength=len(points) * len(tracks),
+    ).reshape(len(points), len(tracks))
+    np.cumsum(prefix, axis=0, out=prefix)
+
+    # window j only reads rows at or after j, since j earlier reference dates and window starts sort
+    # before both its ends, so it can be written over row j of the prefix sums
+    for j, (end, start) in enumerate(
+        zip(points.get_indexer(references), points.get_indexer(starts))
+    ):
+        np.subtract(prefix[end], prefix[start], out=prefix[j])
+
+    return pd.DataFrame(
+        prefix[: len(references)].T,
+        index=pd.Index(tracks, name="spotify_track_uri"),
+        columns=references,
+    )
+
+
+def get_top_tracks_by_reference_date(
+    scores: pd.DataFrame, size: int = 20
+) -> pd.DataFrame:
+    """Top size tracks with a positive score at each reference date, in long form with a rank column."""
+    # one date at a time, so only a single column of scores is ever copied
+    picks = (
+        [_top_rows(scores[date].to_numpy(), size) for date in scores.columns]
+        if size > 0
+        else []
+    )
+
+    return _top_tracks_frame(scores.columns[: len(picks)], scores.index, picks)